@@ -219,6 +219,8 @@ class PhotonAPI(Router):
             res.json({"error": "Not Found", "path": req.path}, 404)
         elif status_code == 405:
             res.json({"error": "Method Not Allowed", "method": req.method, "path": req.path}, 405)
+        elif status_code == 413:
+            res.json({"error": "Payload Too Large", "max_body": req.MAX_BODY}, 413)
         elif status_code == 500:
             if self.debug and exception:
                 res.json({
@@ -240,10 +242,10 @@ class PhotonAPI(Router):
             if self._shutting_down:
                 res.json({"error": "Server is shutting down"}, 503)
                 res.set_header("Connection", "close")
-                return res.as_wsgi(start_response)
+                return res.as_wsgi(start_response, environ)
 
             if self._serve_static(req, res):
-                return res.as_wsgi(start_response)
+                return res.as_wsgi(start_response, environ)
 
             def dispatch(req, res):
                 result, params = self.resolve(req.path, req.method)
@@ -256,6 +258,10 @@ class PhotonAPI(Router):
                     self._handle_error(req, res, 405)
                     return res
 
+                if req.content_length > req.MAX_BODY:
+                    self._handle_error(req, res, 413)
+                    return res
+
                 route = result
                 req.params = params
 
@@ -304,7 +310,7 @@ class PhotonAPI(Router):
                 start_response(status_line, headers)
                 return result
 
-            return res.as_wsgi(start_response)
+            return res.as_wsgi(start_response, environ)
         finally:
             with self._active_lock:
                 self._active_requests -= 1
@@ -200,7 +200,7 @@ def cmd_routes(args):
 
     print(f"\n  ⚡ {len(app.routes)} routes\n")
     for route in app.routes:
-        for method in route.methods:
+        for method in sorted(route.methods):
             color = method_colors.get(method, "")
             print(f"  {color}{method:7s}{reset} {route.path:40s} → {route.name}")
     print()
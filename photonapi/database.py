@@ -166,6 +166,20 @@ class Database:
 
         return cursor
 
+    def executemany(self, sql, seq_of_params):
+        start = time.time()
+        conn = self.connection
+        cursor = conn.cursor()
+        cursor.executemany(sql, seq_of_params)
+        if self.backend != "postgresql":
+            conn.commit()
+
+        elapsed_ms = (time.time() - start) * 1000
+        if self._sql_profiler:
+            self._sql_profiler.record(sql, None, elapsed_ms)
+
+        return cursor
+
     def query(self, sql, params=None):
         cursor = self.execute(sql, params)
         rows = cursor.fetchall()
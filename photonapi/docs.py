@@ -159,7 +159,7 @@ def _highlight_path(path):
 
 def _build_route_html(idx, route):
     parts = []
-    for method in route.methods:
+    for method in sorted(route.methods):
         tags = ""
         params_rows = ""
 
@@ -128,7 +128,7 @@ class GZipMiddleware:
         body = res.body
         if isinstance(body, str):
             body = body.encode("utf-8")
-        if len(body) < self.min_size:
+        if not isinstance(body, bytes) or len(body) < self.min_size:
             return result
 
         compressed = gzip.compress(body, compresslevel=self.level)
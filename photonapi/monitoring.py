@@ -3,9 +3,48 @@ import threading
 import os
 import json
 from collections import defaultdict
+from concurrent.futures import Future
 from functools import wraps
 
 
+class _BoundCounter:
+    __slots__ = ("_metric", "_key")
+
+    def __init__(self, metric, key):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount=1):
+        self._metric._add(self._key, amount)
+
+    def get(self):
+        return self._metric._values.get(self._key, 0)
+
+
+class _BoundGauge(_BoundCounter):
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        self._metric._add(self._key, -amount)
+
+    def set(self, value):
+        self._metric._set(self._key, value)
+
+
+class _BoundHistogram:
+    __slots__ = ("_metric", "_key")
+
+    def __init__(self, metric, key):
+        self._metric = metric
+        self._key = key
+
+    def observe(self, value):
+        self._metric._observe(self._key, value)
+
+    def percentile(self, p):
+        return self._metric._percentile(self._key, p)
+
+
 class Counter:
     def __init__(self, name, description="", labels=None):
         self.name = name
@@ -14,8 +53,13 @@ class Counter:
         self._values = defaultdict(float)
         self._lock = threading.Lock()
 
+    def labels(self, **labels):
+        return _BoundCounter(self, tuple(sorted(labels.items())))
+
     def inc(self, amount=1, **labels):
-        key = tuple(sorted(labels.items()))
+        self._add(tuple(sorted(labels.items())), amount)
+
+    def _add(self, key, amount):
         with self._lock:
             self._values[key] += amount
 
@@ -36,20 +80,25 @@ class Gauge:
         self._values = defaultdict(float)
         self._lock = threading.Lock()
 
+    def labels(self, **labels):
+        return _BoundGauge(self, tuple(sorted(labels.items())))
+
     def set(self, value, **labels):
-        key = tuple(sorted(labels.items()))
-        with self._lock:
-            self._values[key] = value
+        self._set(tuple(sorted(labels.items())), value)
 
     def inc(self, amount=1, **labels):
-        key = tuple(sorted(labels.items()))
-        with self._lock:
-            self._values[key] += amount
+        self._add(tuple(sorted(labels.items())), amount)
 
     def dec(self, amount=1, **labels):
-        key = tuple(sorted(labels.items()))
+        self._add(tuple(sorted(labels.items())), -amount)
+
+    def _set(self, key, value):
         with self._lock:
-            self._values[key] -= amount
+            self._values[key] = value
+
+    def _add(self, key, amount):
+        with self._lock:
+            self._values[key] += amount
 
     def get(self, **labels):
         key = tuple(sorted(labels.items()))
@@ -71,13 +120,20 @@ class Histogram:
         self._observations = defaultdict(list)
         self._lock = threading.Lock()
 
+    def labels(self, **labels):
+        return _BoundHistogram(self, tuple(sorted(labels.items())))
+
     def observe(self, value, **labels):
-        key = tuple(sorted(labels.items()))
+        self._observe(tuple(sorted(labels.items())), value)
+
+    def _observe(self, key, value):
         with self._lock:
             self._observations[key].append(value)
 
     def percentile(self, p, **labels):
-        key = tuple(sorted(labels.items()))
+        return self._percentile(tuple(sorted(labels.items())), p)
+
+    def _percentile(self, key, p):
         with self._lock:
             vals = sorted(self._observations.get(key, []))
         if not vals:
@@ -181,9 +237,16 @@ class MetricsRegistry:
 
 
 class MetricsCollector:
-    def __init__(self, app=None, endpoint="/metrics", enable_default=True):
+    MAX_BOUND = 1024
+
+    def __init__(self, app=None, endpoint="/metrics", enable_default=True, snapshot_ttl=0.1):
         self.registry = MetricsRegistry()
         self._start_time = time.time()
+        self._bound = {}
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshots = {}
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
         self.app = app
 
         if enable_default:
@@ -214,25 +277,58 @@ class MetricsCollector:
         def metrics_endpoint(req, res):
             accept = req.headers.get("Accept", "")
             if "application/json" in accept:
-                return collector.registry.collect_all()
-            res.text(collector.registry.to_prometheus())
+                return collector.snapshot("json")
+            res.text(collector.snapshot("prometheus"))
             res.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
             return res
 
         @app.get(f"{endpoint}/json")
         def metrics_json(req, res):
-            data = collector.registry.collect_all()
+            data = dict(collector.snapshot("json"))
             data["uptime_seconds"] = round(time.time() - collector._start_time, 1)
             data["process"] = {
                 "pid": os.getpid(),
             }
             return data
 
+    def snapshot(self, fmt="prometheus"):
+        with self._inflight_lock:
+            cached = self._snapshots.get(fmt)
+            if cached and time.monotonic() - cached[0] < self.snapshot_ttl:
+                return cached[1]
+            future = self._inflight.get(fmt)
+            leader = future is None
+            if leader:
+                future = self._inflight[fmt] = Future()
+
+        if not leader:
+            return future.result(timeout=5)
+
+        try:
+            if fmt == "json":
+                data = self.registry.collect_all()
+            else:
+                data = self.registry.to_prometheus()
+        except Exception as e:
+            with self._inflight_lock:
+                self._inflight.pop(fmt, None)
+            future.set_exception(e)
+            raise
+
+        with self._inflight_lock:
+            self._snapshots[fmt] = (time.monotonic(), data)
+            self._inflight.pop(fmt, None)
+        future.set_result(data)
+        return data
+
     def middleware(self):
         collector = self
 
+        active = collector.active_connections.labels()
+        bound = collector._bound
+
         def metrics_middleware(req, res, next_fn):
-            collector.active_connections.inc()
+            active.inc()
             start = time.perf_counter()
 
             try:
@@ -240,20 +336,27 @@ class MetricsCollector:
                 return result
             finally:
                 elapsed = time.perf_counter() - start
-                collector.request_count.inc(
-                    method=req.method, endpoint=req.path, status=str(res.status_code)
-                )
-                collector.request_latency.observe(
-                    elapsed, method=req.method, endpoint=req.path
-                )
+                key = (req.method, req.path, res.status_code)
+                children = bound.get(key)
+                if children is None:
+                    children = (
+                        collector.request_count.labels(
+                            method=req.method, endpoint=req.path, status=str(res.status_code)
+                        ),
+                        collector.request_latency.labels(method=req.method, endpoint=req.path),
+                        collector.response_size.labels(method=req.method, endpoint=req.path),
+                    )
+                    if len(bound) < collector.MAX_BOUND:
+                        bound[key] = children
+                count, latency, size = children
+                count.inc()
+                latency.observe(elapsed)
                 body = res.body
                 if isinstance(body, str):
                     body = body.encode()
                 if isinstance(body, bytes):
-                    collector.response_size.observe(
-                        len(body), method=req.method, endpoint=req.path
-                    )
-                collector.active_connections.dec()
+                    size.observe(len(body))
+                active.dec()
 
         return metrics_middleware
 
@@ -40,7 +40,7 @@ def generate_openapi_spec(app, title=None, version=None, description="",
         if path not in spec["paths"]:
             spec["paths"][path] = {}
 
-        for method in route.methods:
+        for method in sorted(route.methods):
             operation = _build_operation(route, method)
             spec["paths"][path][method.lower()] = operation
 
@@ -4,18 +4,23 @@ import cProfile
 import pstats
 import io
 import tracemalloc
+from array import array
 from functools import wraps
 from collections import defaultdict
 
 
 class RequestProfiler:
+    _ENTRY_KEYS = ("method", "path", "status", "duration_ms", "timestamp")
+
     def __init__(self, app=None, enabled=True, slow_threshold_ms=500):
         self.enabled = enabled
         self.slow_threshold = slow_threshold_ms / 1000
-        self._profiles = []
+        self._max_profiles = 1000
+        self._profiles = [dict.fromkeys(self._ENTRY_KEYS) for _ in range(self._max_profiles)]
+        self._idx = 0
+        self._count = 0
         self._slow_requests = []
         self._lock = threading.Lock()
-        self._max_profiles = 1000
 
         if app:
             self.init_app(app)
@@ -26,7 +31,7 @@ class RequestProfiler:
         @app.get("/debug/profiler")
         def profiler_stats(req, res):
             return {
-                "total_profiled": len(profiler._profiles),
+                "total_profiled": profiler._count,
                 "slow_requests": profiler._slow_requests[-20:],
                 "slow_threshold_ms": profiler.slow_threshold * 1000,
             }
@@ -35,6 +40,14 @@ class RequestProfiler:
         def slow_requests(req, res):
             return {"slow_requests": profiler._slow_requests[-50:]}
 
+    def get_profiles(self):
+        with self._lock:
+            if self._count < self._max_profiles:
+                ring = self._profiles[:self._count]
+            else:
+                ring = self._profiles[self._idx:] + self._profiles[:self._idx]
+            return [dict(entry) for entry in ring]
+
     def middleware(self):
         profiler = self
 
@@ -46,21 +59,20 @@ class RequestProfiler:
             result = next_fn()
             elapsed = time.perf_counter() - start
 
-            entry = {
-                "method": req.method,
-                "path": req.path,
-                "status": res.status_code,
-                "duration_ms": round(elapsed * 1000, 2),
-                "timestamp": time.time(),
-            }
-
             with profiler._lock:
-                profiler._profiles.append(entry)
-                if len(profiler._profiles) > profiler._max_profiles:
-                    profiler._profiles = profiler._profiles[-profiler._max_profiles:]
+                entry = profiler._profiles[profiler._idx]
+                entry["method"] = req.method
+                entry["path"] = req.path
+                entry["status"] = res.status_code
+                entry["duration_ms"] = round(elapsed * 1000, 2)
+                entry["timestamp"] = time.time()
+                profiler._idx = (profiler._idx + 1) % profiler._max_profiles
+                if profiler._count < profiler._max_profiles:
+                    profiler._count += 1
 
                 if elapsed > profiler.slow_threshold:
-                    profiler._slow_requests.append(entry)
+                    # ring slots are reused
+                    profiler._slow_requests.append(dict(entry))
                     if len(profiler._slow_requests) > 200:
                         profiler._slow_requests = profiler._slow_requests[-200:]
 
@@ -73,43 +85,74 @@ class SQLProfiler:
     def __init__(self, enabled=True, log_queries=True):
         self.enabled = enabled
         self.log_queries = log_queries
-        self._queries = []
         self._lock = threading.Lock()
         self._max_queries = 5000
+        self._reset()
+
+    def _reset(self):
+        self._durations = array("d")
+        self._timestamps = array("d")
+        self._sql = []
+        self._params = []
+        self._idx = 0
 
     def record(self, sql, params=None, duration_ms=0):
         if not self.enabled:
             return
 
-        entry = {
-            "sql": sql,
-            "params": str(params) if params else None,
-            "duration_ms": round(duration_ms, 2),
-            "timestamp": time.time(),
-        }
+        params = str(params) if params else None
+        duration = round(duration_ms, 2)
+        now = time.time()
 
         with self._lock:
-            self._queries.append(entry)
-            if len(self._queries) > self._max_queries:
-                self._queries = self._queries[-self._max_queries:]
+            if len(self._durations) < self._max_queries:
+                self._durations.append(duration)
+                self._timestamps.append(now)
+                self._sql.append(sql)
+                self._params.append(params)
+            else:
+                i = self._idx
+                self._durations[i] = duration
+                self._timestamps[i] = now
+                self._sql[i] = sql
+                self._params[i] = params
+                self._idx = (i + 1) % self._max_queries
 
         if self.log_queries:
             color = "\033[31m" if duration_ms > 100 else "\033[33m" if duration_ms > 10 else "\033[36m"
             print(f"  {color}SQL\033[0m ({duration_ms:.1f}ms): {sql[:120]}")
 
+    def _ordered_indices(self):
+        n = len(self._durations)
+        return [(self._idx + i) % n for i in range(n)]
+
+    def _entry(self, i):
+        return {
+            "sql": self._sql[i],
+            "params": self._params[i],
+            "duration_ms": self._durations[i],
+            "timestamp": self._timestamps[i],
+        }
+
+    def get_queries(self):
+        with self._lock:
+            return [self._entry(i) for i in self._ordered_indices()]
+
     def get_slow_queries(self, threshold_ms=50):
         with self._lock:
-            return [q for q in self._queries if q["duration_ms"] > threshold_ms]
+            durations = self._durations
+            return [self._entry(i) for i in self._ordered_indices() if durations[i] > threshold_ms]
 
     def get_stats(self):
         with self._lock:
-            if not self._queries:
+            durations = self._durations
+            if not durations:
                 return {"total": 0}
 
-            durations = [q["duration_ms"] for q in self._queries]
+            n = len(durations)
             return {
-                "total": len(self._queries),
-                "avg_ms": round(sum(durations) / len(durations), 2),
+                "total": n,
+                "avg_ms": round(sum(durations) / n, 2),
                 "max_ms": round(max(durations), 2),
                 "min_ms": round(min(durations), 2),
                 "slow_count": sum(1 for d in durations if d > 50),
@@ -117,7 +160,7 @@ class SQLProfiler:
 
     def clear(self):
         with self._lock:
-            self._queries.clear()
+            self._reset()
 
 
 class CPUProfiler:
@@ -248,7 +291,7 @@ class DebugToolbar:
         def debug_overview(req, res):
             return {
                 "profiler": {
-                    "total_requests": len(toolbar.request_profiler._profiles),
+                    "total_requests": toolbar.request_profiler._count,
                     "slow_count": len(toolbar.request_profiler._slow_requests),
                 },
                 "sql": toolbar.sql_profiler.get_stats(),
@@ -2,35 +2,63 @@ import os
 import sys
 import time
 import signal
+import queue
 import threading
 import subprocess
 
 
+_CHANGE_EVENTS = frozenset(("created", "modified", "deleted", "moved", "closed"))
+
+
 class HotReloader:
-    def __init__(self, watch_dirs=None, extensions=None, interval=1.0):
+    SCAN_SLICE = 500
+    STOP_TIMEOUT = 0.25
+
+    def __init__(self, watch_dirs=None, extensions=None, interval=1.0, debounce=0.1):
         self.watch_dirs = watch_dirs or ["."]
         self.extensions = extensions or [".py", ".html", ".css", ".js"]
         self.interval = interval
+        self.debounce = debounce
         self._file_mtimes = {}
         self._process = None
+        self._changes = queue.Queue()
+        self._observer = None
+        self._dirs = []
+        self._scan_thread = None
+        self._stop = threading.Event()
 
-    def _get_files(self):
-        files = []
+    def _get_watch_dirs(self):
+        dirs = []
         for watch_dir in self.watch_dirs:
-            for root, dirs, filenames in os.walk(watch_dir):
-                dirs[:] = [d for d in dirs if not d.startswith(('.', '__'))]
-                for fname in filenames:
-                    if any(fname.endswith(ext) for ext in self.extensions):
-                        files.append(os.path.join(root, fname))
-        return files
+            for root, subdirs, _ in os.walk(watch_dir):
+                subdirs[:] = [d for d in subdirs if not d.startswith(('.', '__'))]
+                dirs.append(root)
+        return dirs
 
     def _snapshot(self):
         snap = {}
-        for f in self._get_files():
+        extensions = tuple(self.extensions)
+        known = set(self._dirs)
+        seen = 0
+        for d in list(self._dirs):
             try:
-                snap[f] = os.path.getmtime(f)
+                with os.scandir(d) as it:
+                    for entry in it:
+                        seen += 1
+                        if seen % self.SCAN_SLICE == 0:
+                            time.sleep(0)
+                        name = entry.name
+                        if entry.is_dir(follow_symlinks=False):
+                            if not name.startswith(('.', '__')) and entry.path not in known:
+                                self._dirs.append(entry.path)
+                                known.add(entry.path)
+                        elif name.endswith(extensions):
+                            try:
+                                snap[entry.path] = entry.stat().st_mtime_ns
+                            except OSError:
+                                pass
             except OSError:
-                pass
+                self._dirs.remove(d)
         return snap
 
     def _detect_changes(self):
@@ -48,33 +76,120 @@ class HotReloader:
         self._file_mtimes = current
         return changed
 
+    def _scan_loop(self):
+        while not self._stop.wait(self.interval):
+            changed = self._detect_changes()
+            if changed and self.debounce:
+                time.sleep(self.debounce)
+                changed += [f for f in self._detect_changes() if f not in changed]
+            for path in changed:
+                self._changes.put(path)
+
+    def _use_polling(self):
+        if os.environ.get("PHOTON_RELOAD_POLL") == "1":
+            return True
+        try:
+            import watchdog  # type: ignore[import-not-found]  # noqa: F401
+        except ImportError:
+            return True
+        return False
+
+    def _is_hidden(self, root, path):
+        parts = os.path.relpath(path, root).split(os.sep)
+        return any(p.startswith(('.', '__')) for p in parts)
+
+    def _start_observer(self):
+        from watchdog.observers import Observer  # type: ignore[import-not-found]
+        from watchdog.events import FileSystemEventHandler  # type: ignore[import-not-found]
+
+        reloader = self
+        extensions = tuple(self.extensions)
+
+        class _Handler(FileSystemEventHandler):
+            def __init__(self, root):
+                self.root = root
+
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type not in _CHANGE_EVENTS:
+                    return
+                for path in (event.src_path, getattr(event, "dest_path", None)):
+                    if path and path.endswith(extensions) and not reloader._is_hidden(self.root, path):
+                        reloader._changes.put(path)
+
+        observer = Observer()
+        for root in self.watch_dirs:
+            observer.schedule(_Handler(root), root, recursive=True)
+        observer.start()
+        return observer
+
+    def _drain_events(self):
+        try:
+            first = self._changes.get(timeout=self.interval)
+        except queue.Empty:
+            return []
+
+        changed = [first]
+        deadline = time.monotonic() + self.debounce
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                path = self._changes.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if path not in changed:
+                changed.append(path)
+        return changed
+
     def _start_process(self, script):
-        return subprocess.Popen([sys.executable, script])
+        return subprocess.Popen([sys.executable, script], close_fds=False, shell=False)
+
+    def _stop_process(self):
+        if not self._process:
+            return
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=self.STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
 
     def run(self, script):
-        self._file_mtimes = self._snapshot()
+        self._dirs = self._get_watch_dirs()
+        if not self._use_polling():
+            try:
+                self._observer = self._start_observer()
+                watching = f"{len(self._dirs)} directories"
+            except OSError as e:
+                print(f"  \033[33m!\033[0m  File events unavailable ({e}), falling back to polling")
+        if self._observer is None:
+            self._file_mtimes = self._snapshot()
+            watching = f"{len(self._file_mtimes)} files"
+            self._scan_thread = threading.Thread(target=self._scan_loop, daemon=True)
+            self._scan_thread.start()
         self._process = self._start_process(script)
 
         print(f"\n  \033[1m⚡ PhotonAPI\033[0m hot reload enabled")
-        print(f"  \033[2m  Watching {len(self._file_mtimes)} files for changes\033[0m\n")
+        print(f"  \033[2m  Watching {watching} for changes\033[0m\n")
 
         try:
             while True:
-                time.sleep(self.interval)
-                changed = self._detect_changes()
+                changed = self._drain_events()
                 if changed:
                     short_names = [os.path.basename(f) for f in changed[:3]]
                     print(f"\n  \033[33m↻\033[0m  Changed: {', '.join(short_names)} — restarting...")
-                    self._process.terminate()
-                    self._process.wait()
+                    self._stop_process()
                     self._process = self._start_process(script)
         except KeyboardInterrupt:
             print("\n  \033[2mStopping...\033[0m")
-            if self._process:
-                self._process.terminate()
-                self._process.wait()
+            self._stop.set()
+            if self._observer:
+                self._observer.stop()
+                self._observer.join()
+            self._stop_process()
 
 
-def run_with_reload(script, watch_dirs=None):
-    reloader = HotReloader(watch_dirs=watch_dirs)
+def run_with_reload(script, watch_dirs=None, debounce=0.1):
+    reloader = HotReloader(watch_dirs=watch_dirs, debounce=debounce)
     reloader.run(script)
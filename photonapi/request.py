@@ -2,7 +2,14 @@ import json
 from urllib.parse import parse_qs, urlparse
 
 
+_WSGI_HEADER_CACHE = {"CONTENT_TYPE": "Content-Type", "CONTENT_LENGTH": "Content-Length"}
+_WSGI_HEADER_CACHE_MAX = 512
+
+
 class Request:
+    MAX_BODY = 10 * 1024 * 1024
+    READ_CHUNK = 65536
+
     def __init__(self, environ):
         self.environ = environ
         self.method = environ.get("REQUEST_METHOD", "GET").upper()
@@ -16,31 +23,42 @@ class Request:
         self.params = {}
 
         self._body = None
+        self._body_truncated = False
         self._json = None
         self._form = None
+        self._query = None
         self._headers = None
         self._cookies = None
 
     @property
     def headers(self):
         if self._headers is None:
-            self._headers = {}
+            headers = {}
+            cache = _WSGI_HEADER_CACHE
             for key, value in self.environ.items():
-                if key.startswith("HTTP_"):
+                header_name = cache.get(key)
+                if header_name is None:
+                    if not key.startswith("HTTP_"):
+                        continue
                     header_name = key[5:].replace("_", "-").title()
-                    self._headers[header_name] = value
-                elif key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
-                    header_name = key.replace("_", "-").title()
-                    self._headers[header_name] = value
-            self._headers = CaseInsensitiveDict(self._headers)
+                    if len(cache) < _WSGI_HEADER_CACHE_MAX:
+                        cache[key] = header_name
+                headers[header_name] = value
+            self._headers = CaseInsensitiveDict(headers)
         return self._headers
 
     @property
     def cookies(self):
         if self._cookies is None:
-            self._cookies = {}
-            raw = self.environ.get("HTTP_COOKIE", "")
-            if raw:
+            raw = self.environ.get("HTTP_COOKIE")
+            if not raw:
+                self._cookies = {}
+                return self._cookies
+            rest = raw.replace("; ", "")
+            if ";" not in rest and " " not in rest:
+                self._cookies = dict(pair.split("=", 1) for pair in raw.split("; ") if "=" in pair)
+            else:
+                self._cookies = {}
                 for chunk in raw.split(";"):
                     chunk = chunk.strip()
                     if "=" in chunk:
@@ -51,13 +69,33 @@ class Request:
     @property
     def body(self):
         if self._body is None:
+            if self.content_length > self.MAX_BODY:
+                self._body = b""
+                self._body_truncated = True
+                return self._body
             try:
                 wsgi_input = self.environ.get("wsgi.input")
-                self._body = wsgi_input.read(self.content_length) if wsgi_input else b""
+                if not wsgi_input or not self.content_length:
+                    self._body = b""
+                else:
+                    buf = bytearray()
+                    remaining = self.content_length
+                    while remaining > 0:
+                        chunk = wsgi_input.read(min(remaining, self.READ_CHUNK))
+                        if not chunk:
+                            break
+                        buf += chunk
+                        remaining -= len(chunk)
+                    self._body = bytes(buf)
             except Exception:
                 self._body = b""
         return self._body
 
+    @property
+    def body_truncated(self):
+        self.body
+        return self._body_truncated
+
     @property
     def json(self):
         if self._json is None:
@@ -70,7 +108,7 @@ class Request:
     @property
     def form(self):
         if self._form is None:
-            if "application/x-www-form-urlencoded" in self.content_type:
+            if self.content_length and "application/x-www-form-urlencoded" in self.content_type:
                 self._form = parse_qs(self.body.decode("utf-8"))
             else:
                 self._form = {}
@@ -78,7 +116,9 @@ class Request:
 
     @property
     def query(self):
-        return parse_qs(self.query_string)
+        if self._query is None:
+            self._query = parse_qs(self.query_string) if self.query_string else {}
+        return self._query
 
     def get_query(self, key, default=None):
         vals = self.query.get(key)
@@ -101,14 +141,72 @@ class Request:
 
 
 class CaseInsensitiveDict(dict):
+    def __init__(self, data=None, **kwargs):
+        super().__init__()
+        self._lower = {}
+        self.update(data or (), **kwargs)
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
     def __getitem__(self, key):
-        return super().__getitem__(key.title())
+        return super().__getitem__(self._lower[key.lower()])
 
     def __setitem__(self, key, value):
-        super().__setitem__(key.title(), value)
+        lower = key.lower()
+        existing = self._lower.get(lower)
+        if existing is not None and existing != key:
+            super().__delitem__(existing)
+        self._lower[lower] = key
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(self._lower.pop(key.lower()))
 
     def __contains__(self, key):
-        return super().__contains__(key.title())
+        return isinstance(key, str) and key.lower() in self._lower
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
 
     def get(self, key, default=None):
-        return super().get(key.title(), default)
+        name = self._lower.get(key.lower())
+        if name is None:
+            return default
+        return super().get(name, default)
+
+    def pop(self, key, *default):
+        name = self._lower.pop(key.lower(), None)
+        if name is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        return super().pop(name)
+
+    def popitem(self):
+        key, value = super().popitem()
+        del self._lower[key.lower()]
+        return key, value
+
+    def setdefault(self, key, default=None):
+        name = self._lower.get(key.lower())
+        if name is not None:
+            return super().__getitem__(name)
+        self[key] = default
+        return default
+
+    def update(self, data=(), **kwargs):
+        if hasattr(data, "keys"):
+            data = [(key, data[key]) for key in data.keys()]
+        for key, value in data:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def clear(self):
+        super().clear()
+        self._lower.clear()
+
+    def copy(self):
+        return type(self)(self)
@@ -1,26 +1,51 @@
+import os
 import json
 from datetime import datetime, timezone
 
 
+FILE_CHUNK_SIZE = 65536
+
+_json_encode = json.JSONEncoder(default=str, separators=(",", ":")).encode
+
+
+class _FileBody:
+    __slots__ = ("path",)
+
+    def __init__(self, path):
+        self.path = path
+
+
+def _iter_file(f, chunk_size=FILE_CHUNK_SIZE):
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+
 class Response:
+    _STATUS_PHRASES = {
+        200: "OK", 201: "Created", 204: "No Content",
+        301: "Moved Permanently", 302: "Found", 304: "Not Modified",
+        400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+        404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+        413: "Payload Too Large", 429: "Too Many Requests",
+        500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable",
+    }
+    _STATUS_LINES = {code: f"{code} {phrase}" for code, phrase in _STATUS_PHRASES.items()}
+
     def __init__(self, body="", status=200, content_type="text/html"):
         self.body = body
         self.status_code = status
         self._headers = {"Content-Type": content_type}
         self._cookies = []
-        self._status_phrases = {
-            200: "OK", 201: "Created", 204: "No Content",
-            301: "Moved Permanently", 302: "Found", 304: "Not Modified",
-            400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
-            404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
-            429: "Too Many Requests",
-            500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable",
-        }
 
     @property
     def status(self):
-        phrase = self._status_phrases.get(self.status_code, "Unknown")
-        return f"{self.status_code} {phrase}"
+        return self._STATUS_LINES.get(self.status_code) or f"{self.status_code} Unknown"
 
     def set_header(self, key, value):
         self._headers[key] = value
@@ -60,7 +85,7 @@ class Response:
         return self
 
     def json(self, data, status=200):
-        self.body = json.dumps(data, default=str)
+        self.body = _json_encode(data)
         self.status_code = status
         self._headers["Content-Type"] = "application/json; charset=utf-8"
         return self
@@ -76,8 +101,8 @@ class Response:
         if content_type is None:
             content_type, _ = mimetypes.guess_type(filepath)
             content_type = content_type or "application/octet-stream"
-        with open(filepath, "rb") as f:
-            self.body = f.read()
+        os.stat(filepath)
+        self.body = _FileBody(filepath)
         self._headers["Content-Type"] = content_type
         return self
 
@@ -87,11 +112,19 @@ class Response:
             headers.append(("Set-Cookie", cookie))
         return headers
 
-    def as_wsgi(self, start_response):
+    def as_wsgi(self, start_response, environ=None):
         body = self.body
         if isinstance(body, str):
             body = body.encode("utf-8")
+        elif type(body) is _FileBody:
+            body = open(body.path, "rb")
+            self._headers["Content-Length"] = str(os.fstat(body.fileno()).st_size)
         start_response(self.status, self.build_headers())
+        if hasattr(body, "read"):
+            file_wrapper = environ.get("wsgi.file_wrapper") if environ else None
+            if file_wrapper is not None:
+                return file_wrapper(body, FILE_CHUNK_SIZE)
+            return _iter_file(body)
         return [body]
 
     def __repr__(self):
@@ -101,7 +134,7 @@ class Response:
 class JSONResponse(Response):
     def __init__(self, data, status=200):
         super().__init__(content_type="application/json; charset=utf-8")
-        self.body = json.dumps(data, default=str)
+        self.body = _json_encode(data)
         self.status_code = status
 
 
@@ -6,17 +6,16 @@ class Route:
     def __init__(self, path, handler, methods, name=None):
         self.path = path
         self.handler = handler
-        self.methods = [m.upper() for m in methods]
+        self.methods = frozenset(m.upper() for m in methods)
         self.name = name or handler.__name__
         self._regex, self._param_names = self._compile(path)
 
     def _compile(self, path):
         param_names = []
-        pattern = "^"
+        parts = []
         for segment in path.strip("/").split("/"):
             if not segment:
                 continue
-            pattern += "/"
             if segment.startswith("<") and segment.endswith(">"):
                 inner = segment[1:-1]
                 if ":" in inner:
@@ -25,16 +24,14 @@ class Route:
                     type_hint, pname = "str", inner
                 param_names.append((pname, type_hint))
                 if type_hint == "int":
-                    pattern += r"(\d+)"
+                    parts.append(r"(\d+)")
                 elif type_hint == "path":
-                    pattern += r"(.+)"
+                    parts.append(r"(.+)")
                 else:
-                    pattern += r"([^/]+)"
+                    parts.append(r"([^/]+)")
             else:
-                pattern += re.escape(segment)
-        if not path.strip("/"):
-            pattern += "/"
-        pattern += "$"
+                parts.append(re.escape(segment))
+        pattern = "^/" + "/".join(parts) + "$"
         return re.compile(pattern), param_names
 
     def match(self, path):
@@ -65,18 +62,53 @@ class Route:
 class Router:
     def __init__(self):
         self.routes = []
+        self._routes_by_prefix = {}
+        self._dynamic_routes = []
+        self._static = {}
         self._before_hooks = []
         self._after_hooks = []
 
     def add_route(self, path, handler, methods=None, name=None):
         methods = methods or ["GET"]
         route = Route(path, handler, methods, name)
+        self._index_static(route)
         self.routes.append(route)
+        self._index_route(route)
         return route
 
+    def _index_static(self, route):
+        if "<" in route.path:
+            return
+        key = route.path.rstrip("/") or "/"
+        for method in route.methods:
+            if (key, method) in self._static:
+                continue
+            # an earlier matching route wins, so shadowed paths stay off the fast path
+            if any(method in r.methods and r.match(key) is not None for r in self.routes):
+                continue
+            self._static[(key, method)] = route
+
+    def _index_route(self, route):
+        # parameter-first routes go in every bucket to keep first-match order
+        first = route.path.strip("/").split("/", 1)[0]
+        if first.startswith("<"):
+            self._dynamic_routes.append(route)
+            for bucket in self._routes_by_prefix.values():
+                bucket.append(route)
+        else:
+            bucket = self._routes_by_prefix.get(first)
+            if bucket is None:
+                bucket = self._routes_by_prefix[first] = list(self._dynamic_routes)
+            bucket.append(route)
+
     def resolve(self, path, method):
+        route = self._static.get((path.rstrip("/") or "/", method.upper()))
+        if route is not None:
+            return route, {}
+
         method_mismatch = False
-        for route in self.routes:
+        first = path.strip("/").split("/", 1)[0]
+        for route in self._routes_by_prefix.get(first, self._dynamic_routes):
             params = route.match(path)
             if params is not None:
                 if method.upper() in route.methods:
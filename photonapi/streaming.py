@@ -1,7 +1,7 @@
 import json
 import time
 import threading
-from collections import defaultdict
+from collections import defaultdict, deque
 
 
 class StreamResponse:
@@ -31,20 +31,26 @@ class SSEResponse(StreamResponse):
 
 
 def sse_event(data, event=None, id=None, retry=None):
-    lines = []
+    buf = bytearray()
     if id is not None:
-        lines.append(f"id: {id}")
+        buf += b"id: " + str(id).encode() + b"\n"
     if event:
-        lines.append(f"event: {event}")
+        buf += b"event: " + str(event).encode() + b"\n"
     if retry is not None:
-        lines.append(f"retry: {retry}")
-
-    payload = json.dumps(data) if isinstance(data, (dict, list)) else str(data)
-    for line in payload.split("\n"):
-        lines.append(f"data: {line}")
-    lines.append("")
-    lines.append("")
-    return "\n".join(lines)
+        buf += b"retry: " + str(retry).encode() + b"\n"
+
+    if isinstance(data, (dict, list)):
+        payload = json.dumps(data, separators=(",", ":"))
+    else:
+        payload = str(data)
+    payload = payload.encode("utf-8")
+    if b"\n" in payload:
+        for line in payload.split(b"\n"):
+            buf += b"data: " + line + b"\n"
+    else:
+        buf += b"data: " + payload + b"\n"
+    buf += b"\n"
+    return bytes(buf)
 
 
 def stream_text(generator):
@@ -72,32 +78,31 @@ def stream_sse(generator, event_name=None):
 
 class EventBus:
     def __init__(self):
-        self._channels = defaultdict(list)
+        self._channels = defaultdict(set)
         self._lock = threading.Lock()
 
     def subscribe(self, channel):
         q = EventQueue()
         with self._lock:
-            self._channels[channel].append(q)
+            self._channels[channel].add(q)
         return q
 
     def unsubscribe(self, channel, q):
         with self._lock:
-            if q in self._channels[channel]:
-                self._channels[channel].remove(q)
+            subs = self._channels.get(channel)
+            if subs is not None:
+                subs.discard(q)
 
     def publish(self, channel, data, event=None):
         with self._lock:
-            subscribers = list(self._channels.get(channel, []))
+            subscribers = list(self._channels.get(channel, ()))
         for q in subscribers:
             q.put(data, event)
 
     def broadcast(self, data, event=None):
         with self._lock:
-            all_queues = set()
-            for subs in self._channels.values():
-                all_queues.update(subs)
-        for q in all_queues:
+            snapshot = [q for subs in self._channels.values() for q in subs]
+        for q in dict.fromkeys(snapshot):
             q.put(data, event)
 
     @property
@@ -110,30 +115,29 @@ class EventBus:
 
 class EventQueue:
     def __init__(self, max_size=100):
-        self._queue = []
-        self._lock = threading.Lock()
+        self._queue = deque(maxlen=max_size)
         self._event = threading.Event()
         self._max_size = max_size
         self._closed = False
 
     def put(self, data, event=None):
-        with self._lock:
-            if len(self._queue) >= self._max_size:
-                self._queue.pop(0)
-            self._queue.append((data, event))
+        self._queue.append((data, event))
         self._event.set()
 
     def get(self, timeout=30):
         if self._closed:
             return None, None
         self._event.wait(timeout=timeout)
-        with self._lock:
+        try:
+            item = self._queue.popleft()
+        except IndexError:
+            return None, None
+        if not self._queue:
+            self._event.clear()
+            # a put may have landed before the clear
             if self._queue:
-                item = self._queue.pop(0)
-                if not self._queue:
-                    self._event.clear()
-                return item
-        return None, None
+                self._event.set()
+        return item
 
     def close(self):
         self._closed = True
@@ -1,16 +1,24 @@
 import threading
 import queue
+import logging
 import time
 import traceback
 import sched
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from datetime import datetime
 
 
+logger = logging.getLogger("photonapi.scheduler")
+
+
 class TaskQueue:
+    MAX_RESULTS = 10000
+
     def __init__(self, workers=2, max_retries=0, retry_delay=1.0):
         self._queue = queue.PriorityQueue()
-        self._results = {}
+        self._results = OrderedDict()
         self._workers = []
         self._running = True
         self._max_retries = max_retries
@@ -18,6 +26,7 @@ class TaskQueue:
         self._lock = threading.Lock()
         self._counter = 0
         self._callbacks = {}
+        self._done_events = {}
 
         for i in range(workers):
             t = threading.Thread(target=self._worker, daemon=True, name=f"photon-worker-{i}")
@@ -26,20 +35,21 @@ class TaskQueue:
 
     def _worker(self):
         while self._running:
-            try:
-                priority, _, task_id, fn, args, kwargs, retries = self._queue.get(timeout=1)
-            except queue.Empty:
-                continue
+            priority, _, task_id, fn, args, kwargs, retries = self._queue.get()
+            if fn is None:
+                self._queue.task_done()
+                break
 
             try:
                 result = fn(*args, **kwargs)
-                self._results[task_id] = {
+                self._store_result(task_id, {
                     "status": "done", "result": result, "error": None,
                     "completed_at": datetime.now().isoformat(),
-                }
-                if task_id in self._callbacks:
+                })
+                callback = self._callbacks.pop(task_id, None)
+                if callback:
                     try:
-                        self._callbacks[task_id](result)
+                        callback(result)
                     except Exception:
                         pass
             except Exception as e:
@@ -49,39 +59,52 @@ class TaskQueue:
                         self._counter += 1
                         self._queue.put((priority, self._counter, task_id, fn, args, kwargs, retries + 1))
                 else:
-                    self._results[task_id] = {
+                    self._callbacks.pop(task_id, None)
+                    self._store_result(task_id, {
                         "status": "failed", "result": None,
                         "error": str(e), "traceback": traceback.format_exc(),
                         "completed_at": datetime.now().isoformat(),
-                    }
+                    })
             finally:
                 self._queue.task_done()
 
+    def _store_result(self, task_id, entry):
+        with self._lock:
+            self._results[task_id] = entry
+            self._results.move_to_end(task_id)
+            while len(self._results) > self.MAX_RESULTS:
+                evicted, _ = self._results.popitem(last=False)
+                self._done_events.pop(evicted, None)
+            if entry["status"] in ("done", "failed"):
+                event = self._done_events.get(task_id)
+                if event:
+                    event.set()
+
     def submit(self, fn, *args, priority=0, callback=None, **kwargs):
         with self._lock:
             self._counter += 1
-            task_id = f"task-{int(time.time()*1000)}-{self._counter}"
-        self._results[task_id] = {
+            seq = self._counter
+            task_id = f"task-{int(time.time()*1000)}-{seq}"
+            self._done_events[task_id] = threading.Event()
+        self._store_result(task_id, {
             "status": "pending", "result": None, "error": None,
             "submitted_at": datetime.now().isoformat(),
-        }
+        })
         if callback:
             self._callbacks[task_id] = callback
-        self._queue.put((priority, self._counter, task_id, fn, args, kwargs, 0))
+        self._queue.put((priority, seq, task_id, fn, args, kwargs, 0))
         return task_id
 
     def get_status(self, task_id):
         return self._results.get(task_id, {"status": "unknown"})
 
     def wait(self, task_id, timeout=None):
-        start = time.monotonic()
-        while True:
-            status = self.get_status(task_id)
-            if status["status"] in ("done", "failed"):
-                return status
-            if timeout and (time.monotonic() - start) > timeout:
-                return {"status": "timeout"}
-            time.sleep(0.05)
+        event = self._done_events.get(task_id)
+        if event is None:
+            return self.get_status(task_id)
+        if not event.wait(timeout or None):
+            return {"status": "timeout"}
+        return self.get_status(task_id)
 
     def cancel(self, task_id):
         if task_id in self._results:
@@ -93,7 +116,9 @@ class TaskQueue:
     @property
     def stats(self):
         statuses = {}
-        for r in self._results.values():
+        with self._lock:
+            results = list(self._results.values())
+        for r in results:
             s = r["status"]
             statuses[s] = statuses.get(s, 0) + 1
         return {
@@ -105,39 +130,64 @@ class TaskQueue:
 
     def shutdown(self, wait=True):
         self._running = False
+        with self._lock:
+            for _ in self._workers:
+                self._counter += 1
+                self._queue.put((float("-inf"), self._counter, None, None, (), {}, 0))
         if wait:
             for w in self._workers:
                 w.join(timeout=5)
 
 
 class Scheduler:
-    def __init__(self):
+    def __init__(self, max_workers=8):
         self._jobs = {}
         self._running = True
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="photon-sched")
+        self._wake = threading.Event()
+        self._sched = sched.scheduler(time.time, self._delay)
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._thread.start()
 
+    def _delay(self, seconds):
+        if seconds > 0:
+            self._wake.wait(seconds)
+            self._wake.clear()
+
     def _run(self):
         while self._running:
-            now = time.time()
-            for job_id, job in list(self._jobs.items()):
-                if not job["active"]:
-                    continue
-                if now >= job["next_run"]:
-                    try:
-                        threading.Thread(
-                            target=job["fn"], args=job.get("args", ()),
-                            kwargs=job.get("kwargs", {}), daemon=True
-                        ).start()
-                    except Exception:
-                        pass
-                    job["run_count"] += 1
-                    job["last_run"] = now
-                    if job["interval"]:
-                        job["next_run"] = now + job["interval"]
-                    else:
-                        job["active"] = False
-            time.sleep(0.5)
+            self._sched.run()
+            if self._running:
+                self._wake.wait()
+                self._wake.clear()
+
+    def _schedule(self, job_id):
+        job = self._jobs[job_id]
+        job["_event"] = self._sched.enterabs(job["next_run"], 1, self._run_job, (job_id,))
+        self._wake.set()
+
+    def _run_job(self, job_id):
+        job = self._jobs.get(job_id)
+        if not job or not job["active"] or not self._running:
+            return
+        now = time.time()
+        try:
+            future = self._pool.submit(job["fn"], *job.get("args", ()), **job.get("kwargs", {}))
+            future.add_done_callback(lambda f, job_id=job_id: self._job_done(job_id, f))
+        except RuntimeError:
+            return
+        job["run_count"] += 1
+        job["last_run"] = now
+        if job["interval"]:
+            job["next_run"] = now + job["interval"]
+            job["_event"] = self._sched.enterabs(job["next_run"], 1, self._run_job, (job_id,))
+        else:
+            job["active"] = False
+
+    def _job_done(self, job_id, future):
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Scheduled job %s failed", job_id, exc_info=exc)
 
     def every(self, seconds, fn=None, *args, **kwargs):
         def decorator(f):
@@ -147,6 +197,7 @@ class Scheduler:
                 "active": True, "run_count": 0, "last_run": None,
                 "args": args, "kwargs": kwargs,
             }
+            self._schedule(job_id)
             f._job_id = job_id
             return f
 
@@ -164,11 +215,17 @@ class Scheduler:
             "active": True, "run_count": 0, "last_run": None,
             "args": args, "kwargs": kwargs,
         }
+        self._schedule(job_id)
         return job_id
 
     def cancel(self, job_id):
         if job_id in self._jobs:
-            self._jobs[job_id]["active"] = False
+            job = self._jobs[job_id]
+            job["active"] = False
+            try:
+                self._sched.cancel(job["_event"])
+            except (KeyError, ValueError):
+                pass
             return True
         return False
 
@@ -187,6 +244,13 @@ class Scheduler:
 
     def shutdown(self):
         self._running = False
+        for event in self._sched.queue:
+            try:
+                self._sched.cancel(event)
+            except ValueError:
+                pass
+        self._wake.set()
+        self._pool.shutdown(wait=False)
 
 
 _default_queue = None
@@ -3,25 +3,41 @@ import io
 import time
 import copy
 import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
 from functools import wraps
 
 
+_WSGI_HEADER_CACHE = {}
+_WSGI_HEADER_CACHE_MAX = 512
+_tls = threading.local()
+_UNSET = object()
+_SCALARS = frozenset((str, int, float, bool))
+
+
 class TestResponse:
     def __init__(self, status_code, headers, body):
         self.status_code = status_code
         self.headers = dict(headers)
         self._body = body
+        self._text = None
+        self._json = _UNSET
 
     @property
     def text(self):
-        if isinstance(self._body, bytes):
-            return self._body.decode("utf-8")
-        return self._body
+        if self._text is None:
+            if isinstance(self._body, bytes):
+                self._text = self._body.decode("utf-8")
+            else:
+                self._text = self._body
+        return self._text
 
     @property
     def json(self):
-        return json.loads(self.text)
+        if self._json is _UNSET:
+            self._json = json.loads(self.text)
+        return self._json
 
     @property
     def ok(self):
@@ -31,10 +47,66 @@ class TestResponse:
         return f"<TestResponse {self.status_code}>"
 
 
+class _CookieJar(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._header = None
+
+    @property
+    def header(self):
+        if self._header is None:
+            self._header = "; ".join(f"{k}={v}" for k, v in self.items())
+        return self._header
+
+    def __setitem__(self, key, value):
+        self._header = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._header = None
+        super().__delitem__(key)
+
+    def pop(self, *args):
+        self._header = None
+        return super().pop(*args)
+
+    def popitem(self):
+        self._header = None
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self._header = None
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._header = None
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self._header = None
+        super().clear()
+
+
 class TestClient:
+    _ENVIRON_TEMPLATE = {
+        "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80",
+        "HTTP_HOST": "testserver",
+        "wsgi.url_scheme": "http",
+        "REMOTE_ADDR": "127.0.0.1",
+    }
+
     def __init__(self, app):
         self.app = app
-        self.cookies = {}
+        self.cookies = _CookieJar()
+
+    @property
+    def cookies(self):
+        return self._cookies
+
+    @cookies.setter
+    def cookies(self, value):
+        self._cookies = value if isinstance(value, _CookieJar) else _CookieJar(value)
 
     def _build_environ(self, method, path, body=None, headers=None,
                        content_type=None, query_string=""):
@@ -46,27 +118,34 @@ class TestClient:
         elif body is None:
             body = b""
 
-        environ = {
-            "REQUEST_METHOD": method.upper(),
-            "PATH_INFO": path,
-            "QUERY_STRING": query_string,
-            "SERVER_NAME": "testserver",
-            "SERVER_PORT": "80",
-            "HTTP_HOST": "testserver",
-            "wsgi.url_scheme": "http",
-            "wsgi.input": io.BytesIO(body),
-            "CONTENT_LENGTH": str(len(body)),
-            "CONTENT_TYPE": content_type or "",
-            "REMOTE_ADDR": "127.0.0.1",
-        }
-
-        if self.cookies:
-            cookie_str = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
-            environ["HTTP_COOKIE"] = cookie_str
+        # checked out, so a nested request gets its own buffer
+        buf = _tls.__dict__.pop("buf", None)
+        if buf is None:
+            buf = io.BytesIO()
+        buf.seek(0)
+        buf.truncate()
+        buf.write(body)
+        buf.seek(0)
+
+        environ = self._ENVIRON_TEMPLATE.copy()
+        environ["REQUEST_METHOD"] = method.upper()
+        environ["PATH_INFO"] = path
+        environ["QUERY_STRING"] = query_string
+        environ["wsgi.input"] = buf
+        environ["CONTENT_LENGTH"] = str(len(body))
+        environ["CONTENT_TYPE"] = content_type or ""
+
+        if self._cookies:
+            environ["HTTP_COOKIE"] = self._cookies.header
 
         if headers:
+            cache = _WSGI_HEADER_CACHE
             for key, value in headers.items():
-                wsgi_key = f"HTTP_{key.upper().replace('-', '_')}"
+                wsgi_key = cache.get(key)
+                if wsgi_key is None:
+                    wsgi_key = "HTTP_" + key.upper().replace("-", "_")
+                    if len(cache) < _WSGI_HEADER_CACHE_MAX:
+                        cache[key] = wsgi_key
                 environ[wsgi_key] = value
 
         return environ
@@ -82,18 +161,21 @@ class TestClient:
             status_code = int(status.split(" ", 1)[0])
             response_started.append((status_code, response_headers))
 
-        result = self.app(environ, start_response)
+        try:
+            result = self.app(environ, start_response)
 
-        status_code, resp_headers = response_started[0]
+            status_code, resp_headers = response_started[0]
 
-        response_body = b""
-        for chunk in result:
-            if isinstance(chunk, bytes):
-                response_body += chunk
-            elif isinstance(chunk, str):
-                response_body += chunk.encode()
+            buf = bytearray()
+            for chunk in result:
+                if isinstance(chunk, bytes):
+                    buf += chunk
+                elif isinstance(chunk, str):
+                    buf += chunk.encode()
+        finally:
+            _tls.buf = environ["wsgi.input"]
 
-        resp = TestResponse(status_code, resp_headers, response_body)
+        resp = TestResponse(status_code, resp_headers, bytes(buf))
 
         for key, value in resp_headers:
             if key == "Set-Cookie":
@@ -140,6 +222,9 @@ class MockModel:
         self._predictions = predictions or {"label": "mock", "confidence": 1.0}
         self._latency = latency
         self._calls = []
+        self._flat = isinstance(self._predictions, dict) and all(
+            v is None or type(v) in _SCALARS for v in self._predictions.values()
+        )
 
     def preprocess(self, data):
         return data
@@ -148,6 +233,8 @@ class MockModel:
         self._calls.append(data)
         if self._latency:
             time.sleep(self._latency)
+        if self._flat:
+            return self._predictions.copy()
         if callable(self._predictions):
             return self._predictions(data)
         return copy.deepcopy(self._predictions)
@@ -165,13 +252,10 @@ class Factory:
     def __init__(self, model=None, defaults=None):
         self._model = model
         self._defaults = defaults or {}
-        self._sequence = 0
-        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
 
     def _next_seq(self):
-        with self._lock:
-            self._sequence += 1
-            return self._sequence
+        return next(self._sequence)
 
     def build(self, **overrides):
         data = {}
@@ -205,16 +289,16 @@ class DatabaseFixture:
             self._tables_state[name] = rows
 
     def restore(self):
-        for name in self._tables_state:
+        for name, rows in self._tables_state.items():
             self.db.execute(f"DELETE FROM {name}")
-            for row in self._tables_state[name]:
-                cols = [k for k in row.keys() if k != "id"]
-                vals = [row[k] for k in cols]
-                placeholders = ", ".join(["?"] * len(cols))
-                self.db.execute(
-                    f"INSERT INTO {name} ({', '.join(cols)}) VALUES ({placeholders})",
-                    vals
-                )
+            if not rows:
+                continue
+            cols = [k for k in rows[0] if k != "id"]
+            placeholders = ", ".join(["?"] * len(cols))
+            self.db.executemany(
+                f"INSERT INTO {name} ({', '.join(cols)}) VALUES ({placeholders})",
+                [[row[k] for k in cols] for row in rows]
+            )
 
     def reset(self):
         for name in self.db._models:
@@ -227,70 +311,73 @@ class DatabaseFixture:
         return created
 
 
+def _summarize(latencies):
+    # sorts in place
+    latencies.sort()
+    n = len(latencies)
+    total = sum(latencies)
+    avg = total / n
+    if n == 1:
+        return avg, latencies[0], latencies[0], latencies[0], avg, avg, avg, total
+    return (avg, latencies[0], latencies[-1], latencies[int(n * 0.5)],
+            latencies[int(n * 0.9)], latencies[int(n * 0.95)],
+            latencies[int(n * 0.99)], total)
+
+
 class LoadTester:
     def __init__(self, client):
         self.client = client
 
     def run(self, method, path, n=100, concurrency=10, body=None, headers=None):
-        results = {"total": n, "success": 0, "failure": 0, "latencies": []}
-        errors = []
-        lock = threading.Lock()
+        results = {"total": n}
+        # each request owns slot i, so no lock is needed
+        latencies = [None] * n
+        oks = bytearray(n)
+        errors = [None] * n
+
+        client = self.client
+        verb = method.upper()
+        if verb in ("POST", "PUT"):
+            send = getattr(client, verb.lower())
+            call = lambda: send(path, json=body, headers=headers)
+        elif verb == "DELETE":
+            call = lambda: client.delete(path, headers=headers)
+        else:
+            call = lambda: client.get(path, headers=headers)
 
-        def make_request():
+        def make_request(i):
             start = time.perf_counter()
             try:
-                if method.upper() == "GET":
-                    resp = self.client.get(path, headers=headers)
-                elif method.upper() == "POST":
-                    resp = self.client.post(path, json=body, headers=headers)
-                elif method.upper() == "PUT":
-                    resp = self.client.put(path, json=body, headers=headers)
-                elif method.upper() == "DELETE":
-                    resp = self.client.delete(path, headers=headers)
-                else:
-                    resp = self.client.get(path, headers=headers)
-
-                elapsed = time.perf_counter() - start
-                with lock:
-                    results["latencies"].append(elapsed * 1000)
-                    if resp.ok:
-                        results["success"] += 1
-                    else:
-                        results["failure"] += 1
+                resp = call()
+                latencies[i] = (time.perf_counter() - start) * 1000
+                oks[i] = 1 if resp.ok else 0
             except Exception as e:
-                with lock:
-                    results["failure"] += 1
-                    errors.append(str(e))
-
-        threads = []
-        for i in range(n):
-            t = threading.Thread(target=make_request)
-            threads.append(t)
-
-        batch_size = concurrency
-        for i in range(0, len(threads), batch_size):
-            batch = threads[i:i + batch_size]
-            for t in batch:
-                t.start()
-            for t in batch:
-                t.join()
-
-        latencies = sorted(results["latencies"])
-        ln = len(latencies)
-        if ln > 0:
-            results["avg_ms"] = round(sum(latencies) / ln, 2)
-            results["min_ms"] = round(latencies[0], 2)
-            results["max_ms"] = round(latencies[-1], 2)
-            results["p50_ms"] = round(latencies[int(ln * 0.5)], 2)
-            results["p90_ms"] = round(latencies[int(ln * 0.9)], 2) if ln > 1 else results["avg_ms"]
-            results["p95_ms"] = round(latencies[int(ln * 0.95)], 2) if ln > 1 else results["avg_ms"]
-            results["p99_ms"] = round(latencies[int(ln * 0.99)], 2) if ln > 1 else results["avg_ms"]
-            results["rps"] = round(ln / (sum(latencies) / 1000), 1) if sum(latencies) > 0 else 0
+                errors[i] = str(e)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            for i in range(n):
+                ex.submit(make_request, i)
+
+        results["success"] = sum(oks)
+        results["failure"] = n - results["success"]
+        latencies = [ms for ms in latencies if ms is not None]
+        errors = [e for e in errors if e is not None]
+
+        if latencies:
+            avg, mn, mx, p50, p90, p95, p99, total = _summarize(latencies)
+            ln = len(latencies)
+            results["avg_ms"] = round(avg, 2)
+            results["min_ms"] = round(mn, 2)
+            results["max_ms"] = round(mx, 2)
+            results["p50_ms"] = round(p50, 2)
+            results["p90_ms"] = round(p90, 2)
+            results["p95_ms"] = round(p95, 2)
+            results["p99_ms"] = round(p99, 2)
+            results["rps"] = round(ln / (total / 1000), 1) if total > 0 else 0
         else:
             results["avg_ms"] = 0
             results["rps"] = 0
 
-        del results["latencies"]
         if errors:
             results["errors"] = errors[:10]
 
@@ -1,31 +1,80 @@
+import os
+import atexit
 import time
-import uuid
+import random
 import threading
+import contextvars
 import json
+import heapq
+import queue
+import itertools
+import http.client
 from functools import wraps
-from collections import defaultdict
+from urllib.parse import urlsplit
+from collections import defaultdict, deque
 
 
-_trace_context = threading.local()
+_current_span = contextvars.ContextVar("photonapi_current_span", default=None)
+_json_encode = json.JSONEncoder(separators=(",", ":")).encode
 
 
-def get_current_span():
-    return getattr(_trace_context, "current_span", None)
+get_current_span = _current_span.get
 
 
 def set_current_span(span):
-    _trace_context.current_span = span
+    return _current_span.set(span)
+
+
+def _restore_span(token, parent):
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # exited in a different context than it was entered in
+        _current_span.set(parent)
+
+
+_ID_POOL_SIZE = 4096
+_id_pool = threading.local()
+
+
+def _reset_id_pool():
+    global _id_pool
+    _id_pool = threading.local()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_id_pool)
+
+
+def _random_hex(nbytes):
+    pool = _id_pool
+    buf = getattr(pool, "buf", b"")
+    pos = getattr(pool, "pos", 0)
+    if pos + nbytes > len(buf):
+        buf = pool.buf = os.urandom(_ID_POOL_SIZE)
+        pos = 0
+    pool.pos = pos + nbytes
+    return buf[pos:pos + nbytes].hex()
+
+
+def _parse_traceparent(value):
+    parts = value.split("-", 3)
+    if len(parts) >= 3:
+        return parts[1], parts[2]
+    return None, None
 
 
 class SpanContext:
     def __init__(self, trace_id=None, span_id=None, parent_id=None, sampled=True):
-        self.trace_id = trace_id or uuid.uuid4().hex
-        self.span_id = span_id or uuid.uuid4().hex[:16]
+        self.trace_id = trace_id or _random_hex(16)
+        self.span_id = span_id or _random_hex(8)
         self.parent_id = parent_id
         self.sampled = sampled
 
 
 class Span:
+    is_recording = True
+
     def __init__(self, name, context=None, kind="internal", attributes=None):
         self.name = name
         self.context = context or SpanContext()
@@ -35,17 +84,21 @@ class Span:
         self.status = "ok"
         self.status_message = ""
         self.start_time = time.time()
-        self.end_time = None
+        self._start_ns = time.perf_counter_ns()
+        self._end_ns = None
         self._children = []
+        self._dict = None
 
     def set_attribute(self, key, value):
         self.attributes[key] = value
+        self._dict = None
         return self
 
     def add_event(self, name, attributes=None):
+        self._dict = None
         self.events.append({
             "name": name,
-            "timestamp": time.time(),
+            "timestamp": self.start_time + (time.perf_counter_ns() - self._start_ns) / 1e9,
             "attributes": attributes or {},
         })
         return self
@@ -53,25 +106,38 @@ class Span:
     def set_status(self, status, message=""):
         self.status = status
         self.status_message = message
+        self._dict = None
 
     def end(self):
-        self.end_time = time.time()
+        self._end_ns = time.perf_counter_ns()
+        self._dict = None
+
+    @property
+    def end_time(self):
+        if self._end_ns is None:
+            return None
+        return self.start_time + (self._end_ns - self._start_ns) / 1e9
 
     @property
     def duration_ms(self):
-        end = self.end_time or time.time()
-        return round((end - self.start_time) * 1000, 2)
+        end = self._end_ns or time.perf_counter_ns()
+        return (end - self._start_ns) / 1e6
 
     def to_dict(self):
+        if self._dict is not None:
+            return self._dict
+        ctx = self.context
+        end_ns = self._end_ns
+        elapsed = (end_ns or time.perf_counter_ns()) - self._start_ns
         return {
-            "trace_id": self.context.trace_id,
-            "span_id": self.context.span_id,
-            "parent_id": self.context.parent_id,
+            "trace_id": ctx.trace_id,
+            "span_id": ctx.span_id,
+            "parent_id": ctx.parent_id,
             "name": self.name,
             "kind": self.kind,
             "start_time": self.start_time,
-            "end_time": self.end_time,
-            "duration_ms": self.duration_ms,
+            "end_time": self.start_time + elapsed / 1e9 if end_ns is not None else None,
+            "duration_ms": round(elapsed / 1e6, 2),
             "status": self.status,
             "status_message": self.status_message,
             "attributes": self.attributes,
@@ -80,11 +146,11 @@ class Span:
 
     def __enter__(self):
         self._parent = get_current_span()
-        if self._parent:
+        if self._parent is not None and self._parent.is_recording:
             self.context.parent_id = self._parent.context.span_id
             self.context.trace_id = self._parent.context.trace_id
             self._parent._children.append(self)
-        set_current_span(self)
+        self._token = _current_span.set(self)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -95,37 +161,75 @@ class Span:
                 "message": str(exc_val),
             })
         self.end()
-        set_current_span(self._parent)
+        _restore_span(self._token, self._parent)
+        return False
+
+
+class _NoopSpan:
+    # holds the current-span slot so children of a dropped span are dropped too
+    __slots__ = ("_parent", "_token")
+    is_recording = False
+
+    def set_attribute(self, key, value):
+        return self
+
+    def add_event(self, name, attributes=None):
+        return self
+
+    def set_status(self, status, message=""):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        self._parent = get_current_span()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _restore_span(self._token, self._parent)
         return False
 
 
 class Tracer:
+    NUM_SHARDS = 16
+
     def __init__(self, service_name="photonapi", exporter=None, sample_rate=1.0):
         self.service_name = service_name
         self.sample_rate = sample_rate
         self._exporters = []
-        self._spans = []
-        self._lock = threading.Lock()
         self._max_spans = 10000
+        self._seq = itertools.count()
+        self._shards = [
+            (threading.Lock(), deque(maxlen=self._max_spans // self.NUM_SHARDS))
+            for _ in range(self.NUM_SHARDS)
+        ]
 
         if exporter:
             self._exporters.append(exporter)
 
     def start_span(self, name, kind="internal", attributes=None):
         parent = get_current_span()
-        ctx = SpanContext()
-        if parent:
-            ctx.trace_id = parent.context.trace_id
-            ctx.parent_id = parent.context.span_id
+        if parent is None:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return _NoopSpan()
+            ctx = SpanContext()
+        elif parent.is_recording:
+            ctx = SpanContext(parent.context.trace_id, parent_id=parent.context.span_id)
+        else:
+            return _NoopSpan()
 
-        span = Span(name, ctx, kind, attributes)
-        return span
+        return Span(name, ctx, kind, attributes)
 
     def _record_span(self, span):
-        with self._lock:
-            self._spans.append(span.to_dict())
-            if len(self._spans) > self._max_spans:
-                self._spans = self._spans[-self._max_spans:]
+        if not span.is_recording:
+            return
+        d = span._dict = span.to_dict()
+        seq = next(self._seq)
+        lock, ring = self._shards[seq % self.NUM_SHARDS]
+        with lock:
+            ring.append((seq, d))
 
         for exporter in self._exporters:
             try:
@@ -150,8 +254,12 @@ class Tracer:
         return decorator
 
     def get_recent_traces(self, n=50):
-        with self._lock:
-            return self._spans[-n:]
+        tails = []
+        for lock, ring in self._shards:
+            with lock:
+                tails.append(list(ring)[-n:])
+        merged = list(heapq.merge(*tails, key=lambda item: item[0]))
+        return [d for _, d in merged[-n:]]
 
     def add_exporter(self, exporter):
         self._exporters.append(exporter)
@@ -161,27 +269,24 @@ class Tracer:
 
         def tracing_middleware(req, res, next_fn):
             trace_parent = req.headers.get("Traceparent")
-            trace_id = None
-            parent_id = None
-
             if trace_parent:
-                parts = trace_parent.split("-")
-                if len(parts) >= 3:
-                    trace_id = parts[1]
-                    parent_id = parts[2]
-
-            span = tracer.start_span(
-                f"{req.method} {req.path}",
-                kind="server",
-                attributes={
-                    "http.method": req.method,
-                    "http.url": req.path,
-                    "http.host": req.host,
-                    "http.scheme": req.scheme,
-                    "http.remote_addr": req.remote_addr,
-                    "service.name": tracer.service_name,
-                }
-            )
+                trace_id, parent_id = _parse_traceparent(trace_parent)
+            else:
+                trace_id = parent_id = None
+
+            span = tracer.start_span(f"{req.method} {req.path}", kind="server")
+            if not span.is_recording:
+                with span:
+                    return next_fn()
+
+            span.attributes.update({
+                "http.method": req.method,
+                "http.url": req.path,
+                "http.host": req.host,
+                "http.scheme": req.scheme,
+                "http.remote_addr": req.remote_addr,
+                "service.name": tracer.service_name,
+            })
 
             if trace_id:
                 span.context.trace_id = trace_id
@@ -189,9 +294,9 @@ class Tracer:
                 span.context.parent_id = parent_id
 
             with span:
-                res.set_header("X-Trace-Id", span.context.trace_id)
-                traceparent = f"00-{span.context.trace_id}-{span.context.span_id}-01"
-                res.set_header("Traceparent", traceparent)
+                ctx = span.context
+                res.set_header("X-Trace-Id", ctx.trace_id)
+                res.set_header("Traceparent", "00-" + ctx.trace_id + "-" + ctx.span_id + "-01")
 
                 result = next_fn()
 
@@ -212,64 +317,138 @@ class ConsoleExporter:
         print(f"  TRACE {status_icon} {d['name']} ({d['duration_ms']}ms) [{d['trace_id'][:8]}]")
 
 
-class JaegerExporter:
-    def __init__(self, endpoint="http://localhost:14268/api/traces"):
+class _BatchExporter:
+    BATCH_SIZE = 100
+    FLUSH_INTERVAL = 0.5
+    MAX_QUEUE = 1000
+
+    def __init__(self, endpoint):
         self.endpoint = endpoint
+        url = urlsplit(endpoint)
+        self._https = url.scheme == "https"
+        self._netloc = url.netloc
+        self._path = (url.path or "/") + ("?" + url.query if url.query else "")
+        self._conn = None
+        self._queue = queue.Queue(maxsize=self.MAX_QUEUE)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
 
     def export(self, span):
-        import urllib.request
-        d = span.to_dict()
-        payload = json.dumps({
-            "batch": [{
-                "process": {"serviceName": span.attributes.get("service.name", "photonapi")},
-                "spans": [{
-                    "traceId": d["trace_id"],
-                    "spanId": d["span_id"],
-                    "parentSpanId": d["parent_id"] or "",
-                    "operationName": d["name"],
-                    "startTime": int(d["start_time"] * 1_000_000),
-                    "duration": int(d["duration_ms"] * 1000),
-                    "tags": [{"key": k, "value": str(v)} for k, v in d["attributes"].items()],
-                }]
-            }]
-        }).encode()
-
+        if self._closed:
+            return
         try:
-            req = urllib.request.Request(
-                self.endpoint,
-                data=payload,
-                headers={"Content-Type": "application/json"},
-            )
-            urllib.request.urlopen(req, timeout=2)
-        except Exception:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
             pass
 
+    def shutdown(self, timeout=5):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while len(batch) < self.BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    d = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if d is None:
+                    stop = True
+                    break
+                batch.append(d)
+            try:
+                self._send(self._payload(batch))
+            except Exception:
+                pass
+            if stop:
+                break
+        self._close_conn()
 
-class ZipkinExporter:
-    def __init__(self, endpoint="http://localhost:9411/api/v2/spans"):
-        self.endpoint = endpoint
+    def _send(self, payload):
+        for attempt in range(2):
+            try:
+                if self._conn is None:
+                    cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+                    self._conn = cls(self._netloc, timeout=2)
+                self._conn.request("POST", self._path, body=payload,
+                                   headers={"Content-Type": "application/json"})
+                self._conn.getresponse().read()
+                return
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # the collector closed the idle keep-alive connection
+                self._close_conn()
+            except Exception:
+                self._close_conn()
+                return
 
-    def export(self, span):
-        import urllib.request
-        d = span.to_dict()
-        zipkin_span = [{
-            "traceId": d["trace_id"],
-            "id": d["span_id"],
-            "name": d["name"],
-            "timestamp": int(d["start_time"] * 1_000_000),
-            "duration": int(d["duration_ms"] * 1000),
-            "localEndpoint": {"serviceName": span.attributes.get("service.name", "photonapi")},
-            "tags": {k: str(v) for k, v in d["attributes"].items()},
-        }]
-        if d["parent_id"]:
-            zipkin_span[0]["parentId"] = d["parent_id"]
+    def _close_conn(self):
+        if self._conn:
+            self._conn.close()
+        self._conn = None
 
-        try:
-            req = urllib.request.Request(
-                self.endpoint,
-                data=json.dumps(zipkin_span).encode(),
-                headers={"Content-Type": "application/json"},
-            )
-            urllib.request.urlopen(req, timeout=2)
-        except Exception:
-            pass
+    def _payload(self, batch):
+        raise NotImplementedError
+
+
+class JaegerExporter(_BatchExporter):
+    def __init__(self, endpoint="http://localhost:14268/api/traces"):
+        super().__init__(endpoint)
+
+    def _payload(self, batch):
+        processes = {}
+        for d in batch:
+            service = d["attributes"].get("service.name", "photonapi")
+            processes.setdefault(service, []).append({
+                "traceId": d["trace_id"],
+                "spanId": d["span_id"],
+                "parentSpanId": d["parent_id"] or "",
+                "operationName": d["name"],
+                "startTime": int(d["start_time"] * 1_000_000),
+                "duration": int(d["duration_ms"] * 1000),
+                "tags": [
+                    {"key": k, "value": v if type(v) is str else str(v)}
+                    for k, v in d["attributes"].items()
+                ],
+            })
+        return _json_encode({
+            "batch": [
+                {"process": {"serviceName": service}, "spans": spans}
+                for service, spans in processes.items()
+            ]
+        }).encode()
+
+
+class ZipkinExporter(_BatchExporter):
+    def __init__(self, endpoint="http://localhost:9411/api/v2/spans"):
+        super().__init__(endpoint)
+
+    def _payload(self, batch):
+        spans = []
+        for d in batch:
+            zipkin_span = {
+                "traceId": d["trace_id"],
+                "id": d["span_id"],
+                "name": d["name"],
+                "timestamp": int(d["start_time"] * 1_000_000),
+                "duration": int(d["duration_ms"] * 1000),
+                "localEndpoint": {"serviceName": d["attributes"].get("service.name", "photonapi")},
+                "tags": {k: v if type(v) is str else str(v) for k, v in d["attributes"].items()},
+            }
+            if d["parent_id"]:
+                zipkin_span["parentId"] = d["parent_id"]
+            spans.append(zipkin_span)
+        return _json_encode(spans).encode()
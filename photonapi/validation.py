@@ -1,8 +1,131 @@
 import re
-from functools import wraps
+import copy
+from functools import wraps, lru_cache
 from datetime import datetime
 
 
+_EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+_URL_PATTERN = r"^https?://[^\s/$.?#].[^\s]*$"
+
+
+# like re.match with "$", both accept one trailing newline
+def _match_email(v):
+    if v.endswith("\n"):
+        v = v[:-1]
+    at = v.find("@")
+    if at < 1 or v.find("@", at + 1) != -1 or v.split() != [v]:
+        return False
+    return v.find(".", at + 2, len(v) - 1) != -1
+
+
+def _match_url(v):
+    if v.endswith("\n"):
+        v = v[:-1]
+    if v.startswith("https://"):
+        rest = v[8:]
+    elif v.startswith("http://"):
+        rest = v[7:]
+    else:
+        return False
+    if len(rest) < 2 or rest[0] in "/$.?#" or rest[0].isspace() or rest[1] == "\n":
+        return False
+    tail = rest[2:]
+    return not tail or tail.split() == [tail]
+
+
+_PATTERN_MATCHERS = {_EMAIL_PATTERN: _match_email, _URL_PATTERN: _match_url}
+
+_parse_iso = lru_cache(maxsize=1024)(datetime.fromisoformat)
+
+
+def _v_int(field, name, value):
+    t = type(value)
+    if t is int:
+        return value, None
+    if t is bool:
+        return int(value), None
+    # int() rejects digit strings past sys.get_int_max_str_digits()
+    try:
+        return int(value), None
+    except (ValueError, TypeError, OverflowError):
+        return None, f"'{name}' must be an integer"
+
+
+def _v_float(field, name, value):
+    t = type(value)
+    if t is float:
+        return value, None
+    if t is bool:
+        return float(value), None
+    try:
+        return float(value), None
+    except (ValueError, TypeError, OverflowError):
+        return None, f"'{name}' must be a number"
+
+
+def _v_bool(field, name, value):
+    if type(value) is not bool:
+        return None, f"'{name}' must be true or false"
+    return value, None
+
+
+def _v_str(field, name, value):
+    if type(value) is not str and not isinstance(value, str):
+        return None, f"'{name}' must be a string"
+    return value, None
+
+
+def _v_list(field, name, value):
+    if type(value) is not list and not isinstance(value, list):
+        return None, f"'{name}' must be a list"
+    each = field.each
+    if isinstance(each, Field):
+        for i, item in enumerate(value):
+            err = each.validate(f"{name}[{i}]", item)
+            if err:
+                return None, err
+    elif isinstance(each, Schema):
+        for i, item in enumerate(value):
+            _, errors = each.validate(item)
+            if errors:
+                return None, f"'{name}[{i}]': {errors[0]}"
+    return value, None
+
+
+def _v_dict(field, name, value):
+    if type(value) is not dict and not isinstance(value, dict):
+        return None, f"'{name}' must be an object"
+    if field.schema:
+        _, errors = field.schema.validate(value)
+        if errors:
+            return None, f"'{name}': {errors[0]}"
+    return value, None
+
+
+def _v_datetime(field, name, value):
+    if type(value) is str or isinstance(value, str):
+        try:
+            return _parse_iso(value), None
+        except ValueError:
+            return None, f"'{name}' must be a valid ISO datetime"
+    if not isinstance(value, datetime):
+        return None, f"'{name}' must be a datetime"
+    return value, None
+
+
+def _coerce_bool(value):
+    if isinstance(value, str):
+        return value.lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+_TYPE_VALIDATORS = {
+    int: _v_int, float: _v_float, bool: _v_bool, str: _v_str,
+    list: _v_list, dict: _v_dict, datetime: _v_datetime,
+}
+_COERCERS = {int: int, float: float, bool: _coerce_bool, str: str}
+
+
 class Field:
     def __init__(self, field_type=str, required=True, default=None, min_val=None,
                  max_val=None, min_length=None, max_length=None, choices=None,
@@ -17,6 +140,7 @@ class Field:
         self.max_length = max_length
         self.choices = choices
         self.pattern = pattern
+        self._pattern_re = re.compile(pattern) if pattern else None
         self.custom = custom
         self.label = label
         self.description = description
@@ -24,110 +148,107 @@ class Field:
         self.nullable = nullable
         self.each = each
         self.schema = schema
+        self._validate_type = _TYPE_VALIDATORS.get(field_type)
+        self._checks = self._compile()
 
     def validate(self, name, value):
+        return self._clean(name, value)[1]
+
+    def _clean(self, name, value):
         if value is None:
-            if self.nullable:
-                return None
-            if self.required and self.default is None:
-                return f"'{name}' is required"
-            return None
+            if not self.nullable and self.required and self.default is None:
+                return None, f"'{name}' is required"
+            return self.default, None
 
         if self.coerce:
             value = self._coerce(value)
 
-        if self.field_type == int:
-            if not isinstance(value, int) or isinstance(value, bool):
-                try:
-                    int(value)
-                except (ValueError, TypeError):
-                    return f"'{name}' must be an integer"
-        elif self.field_type == float:
-            if not isinstance(value, (int, float)):
+        if self._validate_type is None:
+            cleaned = value
+        else:
+            cleaned, err = self._validate_type(self, name, value)
+            if err:
+                return None, err
+
+        for check in self._checks:
+            err = check(name, value)
+            if err:
+                return None, err
+
+        return cleaned, None
+
+    def _compile(self):
+        checks = []
+        min_val, max_val = self.min_val, self.max_val
+        if min_val is not None or max_val is not None:
+            def check_range(name, value):
+                t = type(value)
+                if t is int or t is float or isinstance(value, (int, float)):
+                    if min_val is not None and value < min_val:
+                        return f"'{name}' must be at least {min_val}"
+                    if max_val is not None and value > max_val:
+                        return f"'{name}' must be at most {max_val}"
+            checks.append(check_range)
+
+        min_length, max_length = self.min_length, self.max_length
+        if min_length is not None or max_length is not None:
+            sized = self.field_type in (str, list, dict)
+            unit = "items" if self.field_type in (list, dict) else "characters"
+
+            def check_length(name, value):
+                if sized or hasattr(value, '__len__'):
+                    n = len(value)
+                    if min_length is not None and n < min_length:
+                        return f"'{name}' must be at least {min_length} {unit}"
+                    if max_length is not None and n > max_length:
+                        return f"'{name}' must be at most {max_length} {unit}"
+            checks.append(check_length)
+
+        choices = self.choices
+        if choices is not None:
+            allowed = ", ".join(str(c) for c in choices)
+            try:
+                lookup = frozenset(choices)
+            except TypeError:
+                lookup = choices
+
+            def check_choices(name, value):
                 try:
-                    float(value)
-                except (ValueError, TypeError):
-                    return f"'{name}' must be a number"
-        elif self.field_type == bool:
-            if not isinstance(value, bool):
-                return f"'{name}' must be true or false"
-        elif self.field_type == list:
-            if not isinstance(value, list):
-                return f"'{name}' must be a list"
-            if self.each:
-                for i, item in enumerate(value):
-                    if isinstance(self.each, Field):
-                        err = self.each.validate(f"{name}[{i}]", item)
-                        if err:
-                            return err
-                    elif isinstance(self.each, Schema):
-                        _, errors = self.each.validate(item)
-                        if errors:
-                            return f"'{name}[{i}]': {errors[0]}"
-        elif self.field_type == dict:
-            if not isinstance(value, dict):
-                return f"'{name}' must be an object"
-            if self.schema:
-                _, errors = self.schema.validate(value)
-                if errors:
-                    return f"'{name}': {errors[0]}"
-        elif self.field_type == str:
-            if not isinstance(value, str):
-                return f"'{name}' must be a string"
-        elif self.field_type == datetime:
-            if isinstance(value, str):
-                try:
-                    datetime.fromisoformat(value)
-                except ValueError:
-                    return f"'{name}' must be a valid ISO datetime"
-            elif not isinstance(value, datetime):
-                return f"'{name}' must be a datetime"
-
-        if self.min_val is not None and isinstance(value, (int, float)):
-            if value < self.min_val:
-                return f"'{name}' must be at least {self.min_val}"
-
-        if self.max_val is not None and isinstance(value, (int, float)):
-            if value > self.max_val:
-                return f"'{name}' must be at most {self.max_val}"
-
-        if self.min_length is not None and hasattr(value, '__len__'):
-            if len(value) < self.min_length:
-                return f"'{name}' must be at least {self.min_length} characters"
-
-        if self.max_length is not None and hasattr(value, '__len__'):
-            if len(value) > self.max_length:
-                return f"'{name}' must be at most {self.max_length} characters"
-
-        if self.choices is not None and value not in self.choices:
-            return f"'{name}' must be one of: {', '.join(str(c) for c in self.choices)}"
-
-        if self.pattern is not None:
-            if not re.match(self.pattern, str(value)):
-                return f"'{name}' does not match required format"
-
-        if self.custom is not None:
-            result = self.custom(value)
-            if result is not True and result is not None:
-                return result if isinstance(result, str) else f"'{name}' failed validation"
-
-        return None
+                    found = value in lookup
+                except TypeError:
+                    found = value in choices
+                if not found:
+                    return f"'{name}' must be one of: {allowed}"
+            checks.append(check_choices)
+
+        if self._pattern_re is not None:
+            match = _PATTERN_MATCHERS.get(self.pattern, self._pattern_re.match)
+
+            def check_pattern(name, value):
+                if not match(value if type(value) is str else str(value)):
+                    return f"'{name}' does not match required format"
+            checks.append(check_pattern)
+
+        custom = self.custom
+        if custom is not None:
+            def check_custom(name, value):
+                result = custom(value)
+                if result is not True and result is not None:
+                    return result if isinstance(result, str) else f"'{name}' failed validation"
+            checks.append(check_custom)
+
+        return checks
 
     def _coerce(self, value):
+        if type(value) is self.field_type:
+            return value
+        coerce = _COERCERS.get(self.field_type)
+        if coerce is None:
+            return value
         try:
-            if self.field_type == int:
-                return int(value)
-            elif self.field_type == float:
-                return float(value)
-            elif self.field_type == bool:
-                if isinstance(value, str):
-                    return value.lower() in ("true", "1", "yes")
-                return bool(value)
-            elif self.field_type == str:
-                return str(value)
+            return coerce(value)
         except (ValueError, TypeError):
-            pass
-        return value
+            return value
 
     def process(self, value):
         if value is None:
@@ -139,7 +260,7 @@ class Field:
         elif self.field_type == float:
             return float(value)
         elif self.field_type == datetime and isinstance(value, str):
-            return datetime.fromisoformat(value)
+            return _parse_iso(value)
         return value
 
 
@@ -170,22 +291,42 @@ def Object(schema=None, required=True, **kw):
 
 
 def Email(required=True, **kw):
-    return Field(str, required=required, pattern=r"^[^@\s]+@[^@\s]+\.[^@\s]+$", **kw)
+    return Field(str, required=required, pattern=_EMAIL_PATTERN, **kw)
 
 
 def URL(required=True, **kw):
-    return Field(str, required=required,
-                 pattern=r"^https?://[^\s/$.?#].[^\s]*$", **kw)
+    return Field(str, required=required, pattern=_URL_PATTERN, **kw)
 
 
 def DateTime(required=True, **kw):
     return Field(datetime, required=required, **kw)
 
 
+_INLINE_TYPES = (str, int, float, bool)
+
+
+def _field_cleaner(field):
+    cls = type(field)
+    if cls.validate is Field.validate and cls.process is Field.process:
+        return field._clean
+
+    def clean(name, value):
+        err = field.validate(name, value)
+        if err:
+            return None, err
+        return field.process(value), None
+    return clean
+
+
 class Schema:
+    MAX_DERIVED = 64
+
     def __init__(self, strict=True, **fields):
         self.fields = {}
         self.strict = strict
+        self._partial = None
+        self._extended = {}
+        self._openapi = None
         for name, val in fields.items():
             if isinstance(val, Field):
                 self.fields[name] = val
@@ -195,6 +336,12 @@ class Schema:
                 self.fields[name] = Field(field_type=val)
             else:
                 self.fields[name] = Field(field_type=type(val), default=val, required=False)
+        self._field_names = frozenset(self.fields)
+        self._plan = tuple(
+            (name, _field_cleaner(field)) for name, field in self.fields.items()
+        )
+        if type(self).validate is Schema.validate:
+            self.validate = self._compile_validator()
 
     def validate(self, data):
         if not isinstance(data, dict):
@@ -202,39 +349,114 @@ class Schema:
 
         errors = []
         cleaned = {}
+        get = data.get
+        add_error = errors.append
 
-        for name, field in self.fields.items():
-            value = data.get(name)
-            error = field.validate(name, value)
+        for name, clean in self._plan:
+            value, error = clean(name, get(name))
             if error:
-                errors.append(error)
-            else:
-                cleaned[name] = field.process(value)
+                add_error(error)
+            elif not errors:
+                cleaned[name] = value
 
         if self.strict:
-            unknown = set(data.keys()) - set(self.fields.keys())
-            if unknown:
+            if not self._field_names.issuperset(data):
+                unknown = data.keys() - self._field_names
                 errors.append(f"Unknown fields: {', '.join(sorted(unknown))}")
 
         if errors:
             return None, errors
         return cleaned, []
 
+    def _compile_validator(self):
+        ns = {"_plan_names": self._field_names}
+        lines = [
+            "def validate(data):",
+            "    if type(data) is not dict and not isinstance(data, dict):",
+            "        return None, ['Request body must be a JSON object']",
+            "    errors = []",
+            "    cleaned = {}",
+            "    get = data.get",
+        ]
+        for i, (name, field) in enumerate(self.fields.items()):
+            key = repr(name)
+            clean = f"c{i}"
+            ns[clean] = self._plan[i][1]
+            lines.append(f"    v = get({key})")
+            if type(field) is Field:
+                lines.append("    if v is None:")
+                if not field.nullable and field.required and field.default is None:
+                    message = f"'{name}' is required"
+                    lines.append(f"        errors.append({message!r})")
+                else:
+                    ns[f"d{i}"] = field.default
+                    lines.append(f"        cleaned[{key}] = d{i}")
+                if field.field_type in _INLINE_TYPES:
+                    ns[f"t{i}"] = field.field_type
+                    lines.append(f"    elif type(v) is t{i}:")
+                    if field._checks:
+                        calls = []
+                        for j, check in enumerate(field._checks):
+                            ns[f"k{i}_{j}"] = check
+                            calls.append(f"k{i}_{j}({key}, v)")
+                        lines += [
+                            f"        err = {' or '.join(calls)}",
+                            "        if err:",
+                            "            errors.append(err)",
+                            "        else:",
+                            f"            cleaned[{key}] = v",
+                        ]
+                    else:
+                        lines.append(f"        cleaned[{key}] = v")
+                lines.append("    else:")
+                indent = "        "
+            else:
+                indent = "    "
+            lines += [
+                f"{indent}v, err = {clean}({key}, v)",
+                f"{indent}if err:",
+                f"{indent}    errors.append(err)",
+                f"{indent}else:",
+                f"{indent}    cleaned[{key}] = v",
+            ]
+        if self.strict:
+            lines += [
+                "    if not _plan_names.issuperset(data):",
+                "        unknown = data.keys() - _plan_names",
+                "        errors.append('Unknown fields: ' + ', '.join(sorted(unknown)))",
+            ]
+        lines += [
+            "    if errors:",
+            "        return None, errors",
+            "    return cleaned, []",
+        ]
+        exec("\n".join(lines), ns)
+        return ns["validate"]
+
     def partial(self):
+        if self._partial is not None:
+            return self._partial
+        # required isn't compiled into the checks
         fields = {}
         for name, field in self.fields.items():
-            f = Field(
-                field_type=field.field_type, required=False, default=field.default,
-                min_val=field.min_val, max_val=field.max_val,
-                min_length=field.min_length, max_length=field.max_length,
-                choices=field.choices, pattern=field.pattern,
-                custom=field.custom, coerce=field.coerce, nullable=field.nullable,
-                each=field.each, schema=field.schema,
-            )
+            f = copy.copy(field)
+            f.required = False
             fields[name] = f
-        return Schema(strict=self.strict, **fields)
+        self._partial = Schema(strict=self.strict, **fields)
+        return self._partial
 
     def extend(self, **extra_fields):
+        # the entry keeps the values alive so their ids aren't reused
+        key = tuple((name, id(val)) for name, val in extra_fields.items())
+        hit = self._extended.get(key)
+        if hit is not None:
+            return hit[1]
+        schema = self._extend(extra_fields)
+        if len(self._extended) < self.MAX_DERIVED:
+            self._extended[key] = (tuple(extra_fields.values()), schema)
+        return schema
+
+    def _extend(self, extra_fields):
         fields = dict(self.fields)
         for name, val in extra_fields.items():
             if isinstance(val, Field):
@@ -246,6 +468,8 @@ class Schema:
         return Schema(strict=self.strict, **fields)
 
     def to_openapi(self):
+        if self._openapi is not None:
+            return self._openapi
         properties = {}
         required = []
         for name, field in self.fields.items():
@@ -256,6 +480,7 @@ class Schema:
         schema = {"type": "object", "properties": properties}
         if required:
             schema["required"] = required
+        self._openapi = schema
         return schema
 
 
@@ -297,6 +522,8 @@ def _field_to_openapi(field):
 
 
 def validate(schema):
+    schema_validate = schema.validate
+
     def decorator(fn):
         @wraps(fn)
         def wrapper(req, res, *args, **kwargs):
@@ -304,7 +531,7 @@ def validate(schema):
             if data is None:
                 res.json({"error": "Invalid JSON body", "details": ["Could not parse request body as JSON"]}, 400)
                 return res
-            cleaned, errors = schema.validate(data)
+            cleaned, errors = schema_validate(data)
             if errors:
                 res.json({"error": "Validation failed", "details": errors}, 422)
                 return res
@@ -315,15 +542,19 @@ def validate(schema):
 
 
 def validate_query(schema):
+    schema_validate = schema.validate
+    names = tuple(schema.fields)
+
     def decorator(fn):
         @wraps(fn)
         def wrapper(req, res, *args, **kwargs):
             data = {}
-            for name in schema.fields:
-                val = req.get_query(name)
+            get_query = req.get_query
+            for name in names:
+                val = get_query(name)
                 if val is not None:
                     data[name] = val
-            cleaned, errors = schema.validate(data)
+            cleaned, errors = schema_validate(data)
             if errors:
                 res.json({"error": "Query validation failed", "details": errors}, 422)
                 return res